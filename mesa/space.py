@@ -17,7 +17,22 @@ import itertools
 
 import numpy as np
 
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from collections.abc import Set as AbstractSet
+
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 from mesa.agent import Agent
 
 Coordinate = Tuple[int, int]
@@ -26,20 +41,129 @@ GridContent = Union[Optional[Agent], Set[Agent]]
 FloatCoordinate = Union[Tuple[float, float], np.ndarray]
 
 
-def accept_tuple_argument(wrapped_function):
-    """Decorator to allow grid methods that take a list of (x, y) coord tuples
-    to also handle a single position, by automatically wrapping tuple in
-    single-item list rather than forcing user to do it.
+class EmptyCells(AbstractSet):
+    """Read-only, set-like view of the empty cells of a grid.
+
+    The grid tracks empty cells as flat indices (x * height + y); this view
+    presents them as (x, y) tuples, so membership tests, len() and iteration
+    behave as they would on a set of coordinates without building one.
+
+    """
+
+    def __init__(self, cells: Collection[int], height: int) -> None:
+        self._cells = cells
+        self._height = height
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[Coordinate]) -> Set[Coordinate]:
+        return set(iterable)
+
+    def __contains__(self, pos: Any) -> bool:
+        try:
+            x, y = pos
+        except (TypeError, ValueError):
+            return False
+        return 0 <= y < self._height and x * self._height + y in self._cells
+
+    def __iter__(self) -> Iterator[Coordinate]:
+        height = self._height
+        for index in self._cells:
+            yield divmod(index, height)
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, set(self))
+
+
+# Neighborhood offset tables, keyed by (moore, include_center, radius).
+_offset_cache = {}  # type: Dict[Tuple[bool, bool, int], np.ndarray]
+
+
+def _neighborhood_offsets(moore: bool, include_center: bool, radius: int) -> np.ndarray:
+    """Return the (N, 2) array of (dx, dy) offsets making up a neighborhood,
+    ordered by dy and then dx.
+
+    The tables only depend on the neighborhood shape, so they are built once
+    and shared by all grids.
 
     """
+    key = (moore, include_center, radius)
+    offsets = _offset_cache.get(key)
+    if offsets is None:
+        steps = np.arange(-radius, radius + 1)
+        dx, dy = (a.ravel() for a in np.meshgrid(steps, steps))
+        keep = np.ones(dx.shape, dtype=bool)
+        if not include_center:
+            keep &= (dx != 0) | (dy != 0)
+        if not moore:
+            # Skip coordinates that are outside manhattan distance
+            keep &= np.abs(dx) + np.abs(dy) <= radius
+        offsets = np.stack((dx[keep], dy[keep]), axis=1)
+        _offset_cache[key] = offsets
+    return offsets
+
+
+def _cache_size(width: int, height: int) -> int:
+    """ Room for the Moore and Von Neumann neighborhoods of every cell. """
+    return max(4096, 2 * width * height)
+
+
+def _make_neighborhood_fn(
+    width: int, height: int, torus: bool
+) -> Callable[..., Tuple[Coordinate, ...]]:
+    """Build the function computing neighborhoods on a grid of the given shape.
+
+    The shape of a grid never changes, so it is bound into the returned
+    closure once rather than read from the grid on every call. Its results
+    are memoised in an LRU cache large enough to hold the Moore and Von
+    Neumann neighborhoods of every cell. Each grid builds its own function,
+    so the cache is freed along with the grid.
 
-    def wrapper(*args: Any):
-        if isinstance(args[1], tuple) and len(args[1]) == 2:
-            return wrapped_function(args[0], [args[1]])
+    """
+    bounds = (width, height)
+    # On a torus of at least 3x3 no two radius-1 neighbors share a cell.
+    unroll = torus and width > 2 and height > 2
+    # A window at least as wide as the torus wraps onto cells more than once.
+    dedupe_radius = (min(width, height) + 1) // 2
+
+    @lru_cache(maxsize=_cache_size(width, height))
+    def neighborhood(
+        x: int, y: int, moore: bool, include_center: bool, radius: int
+    ) -> Tuple[Coordinate, ...]:
+        if unroll and radius == 1 and not include_center:
+            # The common case, unrolled.
+            xm, xp = (x - 1) % width, (x + 1) % width
+            ym, yp = (y - 1) % height, (y + 1) % height
+            x, y = x % width, y % height
+            if moore:
+                return (
+                    (xm, ym),
+                    (x, ym),
+                    (xp, ym),
+                    (xm, y),
+                    (xp, y),
+                    (xm, yp),
+                    (x, yp),
+                    (xp, yp),
+                )
+            return ((x, ym), (xm, y), (xp, y), (x, yp))
+
+        coords = _neighborhood_offsets(moore, include_center, radius) + (x, y)
+        if torus:
+            coords %= bounds
+            if radius >= dedupe_radius:
+                # Keep the first occurrence of each cell, in offset order.
+                flat = coords[:, 0] * height + coords[:, 1]
+                _, first = np.unique(flat, return_index=True)
+                coords = coords[np.sort(first)]
         else:
-            return wrapped_function(*args)
+            in_bounds = (coords >= 0) & (coords < bounds)
+            coords = coords[in_bounds.all(axis=1)]
+        return tuple(map(tuple, coords.tolist()))
 
-    return wrapper
+    return neighborhood
 
 
 class Grid:
@@ -53,6 +177,13 @@ class Grid:
         width, height: The grid's width and height.
         torus: Boolean which determines whether to treat the grid as a torus.
         grid: Internal list-of-lists which holds the grid cells themselves.
+        neighbor_cache_enabled: Boolean which determines whether
+            get_neighbors results are cached until a cell of the
+            neighborhood changes. Off by default; only enable it if agents
+            are placed and moved exclusively through the grid's methods.
+            Applies to every grid type, HexGrid included. The cache holds
+            at most max(4096, 2 * width * height) queries, dropping the
+            oldest first.
 
     Methods:
         get_neighbors: Returns the objects surrounding a given cell.
@@ -89,22 +220,62 @@ class Grid:
         self.width = width
         self.torus = torus
 
-        self.grid = []  # type: List[List[GridContent]]
-
-        for x in range(self.width):
-            col = []  # type: List[GridContent]
-            for y in range(self.height):
-                col.append(self.default_val())
-            self.grid.append(col)
-
-        # Add all cells to the empties list.
-        self.empties = set(itertools.product(*(range(self.width), range(self.height))))
+        self.grid = [
+            [self.default_val() for _ in range(self.height)] for _ in range(self.width)
+        ]  # type: List[List[GridContent]]
+
+        # Add all cells to the empties list. Cells are tracked by their flat
+        # index x * height + y, which hashes faster than a coordinate tuple.
+        # _empties_list holds the same indices so a random empty cell can be
+        # picked in constant time; _empties maps each index to its slot in
+        # that list, so it can be swap-removed in constant time too.
+        self._empties_list = list(range(self.width * self.height))
+        self._empties = {index: index for index in self._empties_list}
+
+        self._neighborhood_fn = _make_neighborhood_fn(width, height, torus)
+
+        # Per-cell counters, by flat index, bumped on every placement or
+        # removal while the neighbor cache is enabled, so cached get_neighbors
+        # results can tell whether their cells have changed.
+        self._cell_epoch = [0] * (self.width * self.height)
+        self._neighbors_cache = {}  # type: Dict[Any, Tuple[Any, ...]]
+        self._neighbors_cache_size = _cache_size(width, height)
+        self._neighbor_cache_enabled = False
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The neighborhood function is a closure, which cannot be pickled.
+        state = self.__dict__.copy()
+        del state["_neighborhood_fn"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._neighborhood_fn = _make_neighborhood_fn(
+            self.width, self.height, self.torus
+        )
 
     @staticmethod
     def default_val() -> None:
         """ Default value for new cell elements. """
         return None
 
+    @property
+    def neighbor_cache_enabled(self) -> bool:
+        """ Whether get_neighbors results are cached. """
+        return self._neighbor_cache_enabled
+
+    @neighbor_cache_enabled.setter
+    def neighbor_cache_enabled(self, enabled: bool) -> None:
+        # Epochs are not bumped while the cache is off, so anything cached
+        # before it was switched off may be stale.
+        self._neighbor_cache_enabled = enabled
+        self._neighbors_cache.clear()
+
+    @property
+    def empties(self) -> EmptyCells:
+        """ The (x, y) coordinates of all empty cells, as a set-like view. """
+        return EmptyCells(self._empties, self.height)
+
     def __getitem__(self, index: int) -> List[GridContent]:
         return self.grid[index]
 
@@ -113,13 +284,13 @@ class Grid:
         create an iterator that chains the
         rows of grid together as if one list:
         """
-        return itertools.chain(*self.grid)
+        return itertools.chain.from_iterable(self.grid)
 
     def coord_iter(self) -> Iterator[Tuple[GridContent, int, int]]:
         """ An iterator that returns coordinates as well as cell contents. """
-        for row in range(self.width):
-            for col in range(self.height):
-                yield self.grid[row][col], row, col  # agent, x, y
+        for x, column in enumerate(self.grid):
+            for y, cell in enumerate(column):
+                yield cell, x, y  # agent, x, y
 
     def neighbor_iter(
         self, pos: Coordinate, moore: bool = True
@@ -132,8 +303,7 @@ class Grid:
                    diagonals) or Von Neumann (only up/down/left/right).
 
         """
-        neighborhood = self.iter_neighborhood(pos, moore=moore)
-        return self.iter_cell_list_contents(neighborhood)
+        return iter(self.get_neighbors(pos, moore))
 
     def iter_neighborhood(
         self,
@@ -162,31 +332,7 @@ class Grid:
             including the center).
 
         """
-        x, y = pos
-        coordinates = set()  # type: Set[Coordinate]
-        for dy in range(-radius, radius + 1):
-            for dx in range(-radius, radius + 1):
-                if dx == 0 and dy == 0 and not include_center:
-                    continue
-                # Skip coordinates that are outside manhattan distance
-                if not moore and abs(dx) + abs(dy) > radius:
-                    continue
-                # Skip if not a torus and new coords out of bounds.
-                if not self.torus and (
-                    not (0 <= dx + x < self.width) or not (0 <= dy + y < self.height)
-                ):
-                    continue
-
-                px, py = self.torus_adj((x + dx, y + dy))
-
-                # Skip if new coords out of bounds.
-                if self.out_of_bounds((px, py)):
-                    continue
-
-                coords = (px, py)
-                if coords not in coordinates:
-                    coordinates.add(coords)
-                    yield coords
+        return iter(self.get_neighborhood(pos, moore, include_center, radius))
 
     def get_neighborhood(
         self,
@@ -214,7 +360,8 @@ class Grid:
             if not including the center).
 
         """
-        return list(self.iter_neighborhood(pos, moore, include_center, radius))
+        x, y = pos
+        return list(self._neighborhood_fn(x, y, moore, include_center, radius))
 
     def iter_neighbors(
         self,
@@ -242,8 +389,7 @@ class Grid:
             (8 and 4 if not including the center).
 
         """
-        neighborhood = self.iter_neighborhood(pos, moore, include_center, radius)
-        return self.iter_cell_list_contents(neighborhood)
+        return iter(self.get_neighbors(pos, moore, include_center, radius))
 
     def get_neighbors(
         self,
@@ -271,17 +417,51 @@ class Grid:
             (8 and 4 if not including the center).
 
         """
-        return list(self.iter_neighbors(pos, moore, include_center, radius))
+        x, y = pos
+        if not self._neighbor_cache_enabled:
+            neighborhood = self._neighborhood_fn(x, y, moore, include_center, radius)
+            return self._get_cell_list_contents(neighborhood)
+        return self._cached_neighbors(
+            self._neighborhood_fn, x, y, moore, include_center, radius
+        )
+
+    def _cached_neighbors(
+        self, neighborhood_fn: Callable[..., Iterable[Coordinate]], *args: Any
+    ) -> List[GridContent]:
+        """Return the contents of the neighborhood_fn(*args) cells, through
+        the neighbor cache.
+
+        """
+        cache = self._neighbors_cache
+        entry = cache.get(args)
+        if entry is None:
+            neighborhood = tuple(neighborhood_fn(*args))
+            height = self.height
+            indices = [nx * height + ny for nx, ny in neighborhood]
+            stamp, neighbors = -1, []
+        else:
+            neighborhood, indices, stamp, neighbors = entry
+
+        # Epochs only ever grow, so their sum changes whenever any cell of the
+        # neighborhood had an agent placed or removed since the last call.
+        epoch = self._cell_epoch
+        current = sum([epoch[index] for index in indices])
+        if current != stamp:
+            neighbors = self._get_cell_list_contents(neighborhood)
+            if entry is None and len(cache) >= self._neighbors_cache_size:
+                # Dicts keep insertion order, so this drops the oldest query.
+                del cache[next(iter(cache))]
+            cache[args] = (neighborhood, indices, current, neighbors)
+        return list(neighbors)
 
     def torus_adj(self, pos: Coordinate) -> Coordinate:
         """ Convert coordinate, handling torus looping. """
-        if not self.out_of_bounds(pos):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
             return pos
         elif not self.torus:
             raise Exception("Point out of bounds, and space non-toroidal.")
-        else:
-            x, y = pos[0] % self.width, pos[1] % self.height
-        return x, y
+        return x % self.width, y % self.height
 
     def out_of_bounds(self, pos: Coordinate) -> bool:
         """
@@ -291,7 +471,6 @@ class Grid:
         x, y = pos
         return x < 0 or x >= self.width or y < 0 or y >= self.height
 
-    @accept_tuple_argument
     def iter_cell_list_contents(
         self, cell_list: Iterable[Coordinate]
     ) -> Iterator[GridContent]:
@@ -303,9 +482,8 @@ class Grid:
             An iterator of the contents of the cells identified in cell_list
 
         """
-        return (self[x][y] for x, y in cell_list if not self.is_cell_empty((x, y)))
+        return iter(self.get_cell_list_contents(cell_list))
 
-    @accept_tuple_argument
     def get_cell_list_contents(
         self, cell_list: Iterable[Coordinate]
     ) -> List[GridContent]:
@@ -317,7 +495,26 @@ class Grid:
             A list of the contents of the cells identified in cell_list
 
         """
-        return list(self.iter_cell_list_contents(cell_list))
+        # A single position is accepted as well, as a shorthand for [pos].
+        if (
+            isinstance(cell_list, tuple)
+            and len(cell_list) == 2
+            and not isinstance(cell_list[0], (tuple, list))
+        ):
+            cell_list = (cell_list,)
+        return self._get_cell_list_contents(cell_list)
+
+    def _get_cell_list_contents(
+        self, cell_list: Iterable[Coordinate]
+    ) -> List[GridContent]:
+        """ Same as get_cell_list_contents, for a list of positions only. """
+        grid = self.grid
+        contents = []  # type: List[GridContent]
+        for x, y in cell_list:
+            cell = grid[x][y]
+            if cell is not None:
+                contents.append(cell)
+        return contents
 
     def move_agent(self, agent: Agent, pos: Coordinate) -> None:
         """
@@ -343,7 +540,10 @@ class Grid:
         """ Place the agent at the correct location. """
         x, y = pos
         self.grid[x][y] = agent
-        self.empties.discard(pos)
+        index = x * self.height + y
+        if self._neighbor_cache_enabled:
+            self._cell_epoch[index] += 1
+        self._discard_empty(index)
 
     def remove_agent(self, agent: Agent) -> None:
         """ Remove the agent from the grid and set its pos variable to None. """
@@ -355,7 +555,10 @@ class Grid:
         """ Remove the agent from the given location. """
         x, y = pos
         self.grid[x][y] = None
-        self.empties.add(pos)
+        index = x * self.height + y
+        if self._neighbor_cache_enabled:
+            self._cell_epoch[index] += 1
+        self._add_empty(index)
 
     def is_cell_empty(self, pos: Coordinate) -> bool:
         """ Returns a bool of the contents of a cell. """
@@ -365,9 +568,9 @@ class Grid:
     def move_to_empty(self, agent: Agent) -> None:
         """ Moves agent to a random empty cell, vacating agent's old cell. """
         pos = agent.pos
-        if len(self.empties) == 0:
+        if len(self._empties) == 0:
             raise Exception("ERROR: No empty cells")
-        new_pos = agent.random.choice(sorted(self.empties))
+        new_pos = self._random_empty(agent.random)
         self._place_agent(new_pos, agent)
         agent.pos = new_pos
         self._remove_agent(pos, agent)
@@ -388,31 +591,40 @@ class Grid:
         )
 
         if self.exists_empty_cells():
-            pos = random.choice(sorted(self.empties))
+            pos = self._random_empty(random)
             return pos
         else:
             return None
 
     def exists_empty_cells(self) -> bool:
         """ Return True if any cells empty else False. """
-        return len(self.empties) > 0
+        return len(self._empties) > 0
+
+    def _add_empty(self, index: int) -> None:
+        """ Mark the cell with the given flat index as empty. """
+        if index not in self._empties:
+            self._empties[index] = len(self._empties_list)
+            self._empties_list.append(index)
+
+    def _discard_empty(self, index: int) -> None:
+        """ Mark the cell with the given flat index as occupied. """
+        slot = self._empties.pop(index, None)
+        if slot is not None:
+            # Move the last entry into the freed slot.
+            last = self._empties_list.pop()
+            if last != index:
+                self._empties_list[slot] = last
+                self._empties[last] = slot
+
+    def _random_empty(self, rng: Any) -> Coordinate:
+        """ Pick a random empty cell using the given random-number generator. """
+        index = self._empties_list[rng.randrange(len(self._empties_list))]
+        return divmod(index, self.height)
 
 
 class SingleGrid(Grid):
     """ Grid where each cell contains exactly at most one object. """
 
-    empties = set()  # type: Set[Coordinate]
-
-    def __init__(self, width: int, height: int, torus: bool) -> None:
-        """Create a new single-item grid.
-
-        Args:
-            width, height: The width and width of the grid
-            torus: Boolean whether the grid wraps or not.
-
-        """
-        super().__init__(width, height, torus)
-
     def position_agent(
         self, agent: Agent, x: Union[int, str] = "random", y: Union[int, str] = "random"
     ) -> None:
@@ -426,19 +638,19 @@ class SingleGrid(Grid):
 
         """
         if x == "random" or y == "random":
-            if len(self.empties) == 0:
+            if len(self._empties) == 0:
                 raise Exception("ERROR: Grid full")
-            coords = agent.random.choice(sorted(self.empties))
+            coords = self._random_empty(agent.random)
         else:
             coords = (x, y)
         agent.pos = coords
         self._place_agent(coords, agent)
 
     def _place_agent(self, pos: Coordinate, agent: Agent) -> None:
-        if self.is_cell_empty(pos):
-            super()._place_agent(pos, agent)
-        else:
+        x, y = pos
+        if self.grid[x][y] is not None:
             raise Exception("Cell not empty")
+        super()._place_agent(pos, agent)
 
 
 class MultiGrid(Grid):
@@ -469,32 +681,37 @@ class MultiGrid(Grid):
     def _place_agent(self, pos: Coordinate, agent: Agent) -> None:
         """ Place the agent at the correct location. """
         x, y = pos
-        if agent not in self.grid[x][y]:
-            self.grid[x][y].append(agent)
-        self.empties.discard(pos)
+        cell = self.grid[x][y]
+        index = x * self.height + y
+        if agent not in cell:
+            cell.append(agent)
+            if self._neighbor_cache_enabled:
+                self._cell_epoch[index] += 1
+        self._discard_empty(index)
 
     def _remove_agent(self, pos: Coordinate, agent: Agent) -> None:
         """ Remove the agent from the given location. """
         x, y = pos
-        self.grid[x][y].remove(agent)
-        if self.is_cell_empty(pos):
-            self.empties.add(pos)
-
-    @accept_tuple_argument
-    def iter_cell_list_contents(
+        cell = self.grid[x][y]
+        cell.remove(agent)
+        index = x * self.height + y
+        if self._neighbor_cache_enabled:
+            self._cell_epoch[index] += 1
+        if not cell:
+            self._add_empty(index)
+
+    def _get_cell_list_contents(
         self, cell_list: Iterable[Coordinate]
-    ) -> Iterator[GridContent]:
-        """
-        Args:
-            cell_list: Array-like of (x, y) tuples, or single tuple.
-
-        Returns:
-            A iterator of the contents of the cells identified in cell_list
-
-        """
-        return itertools.chain.from_iterable(
-            self[x][y] for x, y in cell_list if not self.is_cell_empty((x, y))
-        )
+    ) -> List[GridContent]:
+        """ Same as get_cell_list_contents, for a list of positions only. """
+        grid = self.grid
+        contents = []  # type: List[GridContent]
+        for x, y in cell_list:
+            # Empty cells are empty lists, so they can be skipped by truthiness.
+            cell = grid[x][y]
+            if cell:
+                contents.extend(cell)
+        return contents
 
 
 class HexGrid(Grid):
@@ -539,7 +756,9 @@ class HexGrid(Grid):
         def torus_adj_2d(pos: Coordinate) -> Coordinate:
             return (pos[0] % self.width, pos[1] % self.height)
 
-        coordinates = set()
+        # Neighbors are kept in the order they are first found.
+        coordinates = []  # type: List[Coordinate]
+        seen = set()  # type: Set[Coordinate]
 
         def find_neighbors(pos: Coordinate, radius: int) -> None:
             x, y = pos
@@ -567,18 +786,20 @@ class HexGrid(Grid):
             else:
                 adjacent = [torus_adj_2d(coord) for coord in adjacent]
 
-            coordinates.update(adjacent)
+            for coords in adjacent:
+                if coords not in seen:
+                    seen.add(coords)
+                    coordinates.append(coords)
 
             if radius > 1:
                 [find_neighbors(coords, radius - 1) for coords in adjacent]
 
         find_neighbors(pos, radius)
 
-        if not include_center and pos in coordinates:
+        if not include_center and pos in seen:
             coordinates.remove(pos)
 
-        for i in coordinates:
-            yield i
+        yield from coordinates
 
     def neighbor_iter(self, pos: Coordinate) -> Iterator[GridContent]:
         """Iterate over position neighbors.
@@ -587,8 +808,7 @@ class HexGrid(Grid):
             pos: (x,y) coords tuple for the position to get the neighbors of.
 
         """
-        neighborhood = self.iter_neighborhood(pos)
-        return self.iter_cell_list_contents(neighborhood)
+        return iter(self.get_neighbors(pos))
 
     def get_neighborhood(
         self, pos: Coordinate, include_center: bool = False, radius: int = 1
@@ -625,8 +845,7 @@ class HexGrid(Grid):
             An iterator of non-None objects in the given neighborhood
 
         """
-        neighborhood = self.iter_neighborhood(pos, include_center, radius)
-        return self.iter_cell_list_contents(neighborhood)
+        return iter(self.get_neighbors(pos, include_center, radius))
 
     def get_neighbors(
         self, pos: Coordinate, include_center: bool = False, radius: int = 1
@@ -644,7 +863,12 @@ class HexGrid(Grid):
             A list of non-None objects in the given neighborhood
 
         """
-        return list(self.iter_neighbors(pos, include_center, radius))
+        if not self._neighbor_cache_enabled:
+            neighborhood = self.get_neighborhood(pos, include_center, radius)
+            return self._get_cell_list_contents(neighborhood)
+        return self._cached_neighbors(
+            self.iter_neighborhood, pos, include_center, radius
+        )
 
 
 class ContinuousSpace:
@@ -108,6 +108,16 @@ import webbrowser
 
 from mesa.visualization.UserParam import UserSettableParameter
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Suppress several pylint warnings for this file.
 # Attributes being defined outside of init is a Tornado feature.
 # pylint: disable=attribute-defined-outside-init
@@ -117,6 +127,33 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
+def _json_encode(value):
+    """Encode a websocket message as UTF-8 JSON bytes.
+
+    orjson is used when it is installed; it also accepts the numpy values
+    that often end up in portrayals, and sends NaN as null. Anything orjson
+    rejects, such as integers wider than 64 bits, goes through the standard
+    library encoder instead, which raises a TypeError on numpy values.
+
+    """
+    if orjson is not None:
+        try:
+            # CanvasGrid renders its layers as integer keys.
+            return orjson.dumps(
+                value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        except orjson.JSONEncodeError:
+            pass
+    return tornado.escape.utf8(tornado.escape.json_encode(value))
+
+
+def _json_decode(value):
+    """Decode a websocket message, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(value)
+    return tornado.escape.json_decode(value)
+
+
 class VisualizationElement:
     """
     Defines an element of the visualization.
@@ -183,13 +220,17 @@ class SocketHandler(tornado.websocket.WebSocketHandler):
     def open(self):
         if self.application.verbose:
             print("Socket opened!")
-        self.write_message(
-            {"type": "model_params", "params": self.application.user_params}
-        )
+        self.write_message(self.application.user_params_message)
 
     def check_origin(self, origin):
         return True
 
+    def write_message(self, message, binary=False):
+        """Send a message, encoding dicts with the module's JSON encoder."""
+        if isinstance(message, dict):
+            message = _json_encode(message)
+        return super().write_message(message, binary=binary)
+
     @property
     def viz_state_message(self):
         return {"type": "viz_state", "data": self.application.render_model()}
@@ -198,7 +239,7 @@ class SocketHandler(tornado.websocket.WebSocketHandler):
         """Receiving a message from the websocket, parse, and act accordingly."""
         if self.application.verbose:
             print(message)
-        msg = tornado.escape.json_decode(message)
+        msg = _json_decode(message)
 
         if msg["type"] == "get_step":
             if not self.application.model.running:
@@ -217,12 +258,7 @@ class SocketHandler(tornado.websocket.WebSocketHandler):
 
             # Is the param editable?
             if param in self.application.user_params:
-                if isinstance(
-                    self.application.model_kwargs[param], UserSettableParameter
-                ):
-                    self.application.model_kwargs[param].value = value
-                else:
-                    self.application.model_kwargs[param] = value
+                self.application.set_user_param(param, value)
 
         else:
             if self.application.verbose:
@@ -250,7 +286,7 @@ class ModularServer(tornado.web.Application):
     handlers = [page_handler, socket_handler, static_handler, local_handler]
 
     settings = {
-        "debug": True,
+        "debug": False,
         "autoreload": False,
         "template_path": os.path.dirname(__file__) + "/templates",
     }
@@ -258,9 +294,20 @@ class ModularServer(tornado.web.Application):
     EXCLUDE_LIST = ("width", "height")
 
     def __init__(
-        self, model_cls, visualization_elements, name="Mesa Model", model_params={}
+        self,
+        model_cls,
+        visualization_elements,
+        name="Mesa Model",
+        model_params={},
+        debug=False,
     ):
-        """ Create a new visualization server with the given elements. """
+        """Create a new visualization server with the given elements.
+
+        Set debug to True while developing a model: Tornado then reports
+        tracebacks to the browser, stops caching templates and static file
+        hashes, and launch() restarts the server when a source file changes.
+
+        """
         # Prep visualization elements:
         self.visualization_elements = visualization_elements
         self.package_includes = set()
@@ -283,22 +330,56 @@ class ModularServer(tornado.web.Application):
             self.description = model_cls.__doc__
 
         self.model_kwargs = model_params
+        self._user_params = None
+        self._user_params_message = None
         self.reset_model()
 
         # Initializing the application itself:
-        super().__init__(self.handlers, **self.settings)
+        super().__init__(self.handlers, **dict(self.settings, debug=debug))
 
     @property
     def user_params(self):
-        result = {}
-        for param, val in self.model_kwargs.items():
-            if isinstance(val, UserSettableParameter):
-                result[param] = val.json
+        """The JSON description of each user-settable parameter.
+
+        Built on first access and reused until set_user_param, reset_model or
+        launch is called. Call one of these after changing model_kwargs, or
+        the value of a parameter in it, directly.
+
+        """
+        if self._user_params is None:
+            result = {}
+            for param, val in self.model_kwargs.items():
+                if isinstance(val, UserSettableParameter):
+                    result[param] = val.json
+            self._user_params = result
+
+        return self._user_params
 
-        return result
+    @property
+    def user_params_message(self):
+        """The model_params message sent to each new socket, as JSON bytes."""
+        if self._user_params_message is None:
+            self._user_params_message = _json_encode(
+                {"type": "model_params", "params": self.user_params}
+            )
+        return self._user_params_message
+
+    def set_user_param(self, name, value):
+        """ Set the value of the model parameter with the given name. """
+        if isinstance(self.model_kwargs[name], UserSettableParameter):
+            self.model_kwargs[name].value = value
+        else:
+            self.model_kwargs[name] = value
+        self._clear_user_params()
+
+    def _clear_user_params(self):
+        """ Drop the cached user_params, so they are rebuilt on next use. """
+        self._user_params = None
+        self._user_params_message = None
 
     def reset_model(self):
         """ Reinstantiate the model object, using the current parameters. """
+        self._clear_user_params()
 
         model_params = {}
         for key, val in self.model_kwargs.items():
@@ -324,8 +405,18 @@ class ModularServer(tornado.web.Application):
             visualization_state.append(element_state)
         return visualization_state
 
-    def launch(self, port=None, open_browser=True):
-        """ Run the app. """
+    def launch(self, port=None, open_browser=True, use_uvloop=True):
+        """Run the app.
+
+        If uvloop is installed, it replaces the asyncio event loop policy of
+        the whole process; pass use_uvloop=False to keep the current one,
+        e.g. when embedding the server in an existing event loop.
+
+        """
+        self._clear_user_params()
+        if use_uvloop and uvloop is not None:
+            # Must happen before listen() creates the event loop.
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         if port is not None:
             self.port = port
         url = "http://127.0.0.1:{PORT}".format(PORT=self.port)
@@ -333,5 +424,6 @@ class ModularServer(tornado.web.Application):
         self.listen(self.port)
         if open_browser:
             webbrowser.open(url)
-        tornado.autoreload.start()
+        if self.settings["debug"]:
+            tornado.autoreload.start()
         tornado.ioloop.IOLoop.current().start()
@@ -10,6 +10,7 @@ requires = ["click", "cookiecutter", "networkx", "numpy", "pandas", "tornado", "
 extras_require = {
     "dev": ["coverage", "flake8", "pytest >= 4.6", "pytest-cov", "sphinx"],
     "docs": ["sphinx", "ipython"],
+    "speedups": ["orjson", "uvloop; sys_platform != 'win32'"],
 }
 
 version = ""
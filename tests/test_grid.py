@@ -1,8 +1,11 @@
 """
 Test the Grid objects.
 """
+import gc
+import pickle
 import random
 import unittest
+import weakref
 from mesa.space import Grid, SingleGrid, MultiGrid, HexGrid
 
 # Initial agent positions for testing
@@ -80,6 +83,13 @@ class TestBaseGrid(unittest.TestCase):
             x, y = agent.pos
             assert agent in self.grid.get_cell_list_contents((x, y))
 
+    def test_cell_list_contents_tuple_of_positions(self):
+        """
+        Ensure that a tuple of two positions is not mistaken for a single one.
+        """
+        positions = tuple(agent.pos for agent in self.agents[:2])
+        assert self.grid.get_cell_list_contents(positions) == self.agents[:2]
+
     def test_iter_cell_agent_reporting(self):
         """
         Ensure that if an agent is in a cell, iter_cell_list_contents
@@ -262,6 +272,43 @@ class TestSingleGrid(unittest.TestCase):
         with self.assertRaises(Exception):
             self.move_to_empty(self.agents[0])
 
+    def test_empties_view(self):
+        """
+        Test that the empties view behaves like a set of coordinates.
+        """
+        expected = {
+            (x, y)
+            for x in range(self.grid.width)
+            for y in range(self.grid.height)
+            if not TEST_GRID[x][y]
+        }
+        assert self.grid.empties == expected
+        assert sorted(self.grid.empties) == sorted(expected)
+        assert (0, 0) in self.grid.empties
+        assert (0, 1) not in self.grid.empties
+        assert (0, self.grid.height) not in self.grid.empties
+        assert None not in self.grid.empties
+
+        self.grid.remove_agent(self.agents[0])
+        assert (0, 1) in self.grid.empties
+        assert len(self.grid.empties) == len(expected) + 1
+
+    def test_move_to_empty_bookkeeping(self):
+        """
+        Test that the empty cells stay in sync with the grid while moving.
+        """
+        for _ in range(50):
+            for agent in self.agents:
+                self.grid.move_to_empty(agent)
+        expected = {
+            (x, y)
+            for x in range(self.grid.width)
+            for y in range(self.grid.height)
+            if self.grid.is_cell_empty((x, y))
+        }
+        assert self.grid.empties == expected
+        assert len(expected) == 15 - len(self.agents)
+
 
 # Number of agents at each position for testing
 # Initial agent positions for testing
@@ -335,6 +382,84 @@ class TestMultiGrid(unittest.TestCase):
         neighbors = self.grid.get_neighbors((1, 3), moore=False, radius=2)
         assert len(neighbors) == 11
 
+    def test_neighborhood_cache(self):
+        """
+        Test that cached neighborhoods are stable and not shared with callers.
+        """
+        neighborhood = self.grid.get_neighborhood((1, 1), moore=True)
+        assert neighborhood[0] == (0, 0)
+        neighborhood.clear()
+        assert self.grid.get_neighborhood((1, 1), moore=True) == [
+            (0, 0),
+            (1, 0),
+            (2, 0),
+            (0, 1),
+            (2, 1),
+            (0, 2),
+            (1, 2),
+            (2, 2),
+        ]
+
+    def test_neighborhood_cache_lifetime(self):
+        """
+        Test that each grid owns its neighborhood cache and frees it.
+        """
+        grid = MultiGrid(self.grid.width, self.grid.height, self.torus)
+        grid.get_neighborhood((1, 1), moore=True)
+        assert grid._neighborhood_fn is not self.grid._neighborhood_fn
+        cache = weakref.ref(grid._neighborhood_fn)
+        del grid
+        gc.collect()
+        assert cache() is None
+
+    def test_neighbor_cache(self):
+        """
+        Test that cached neighbors are refreshed when their cells change.
+        """
+        self.grid.neighbor_cache_enabled = True
+        neighbors = self.grid.get_neighbors((1, 4), moore=True)
+        assert len(neighbors) == 5
+        neighbors.clear()
+        assert len(self.grid.get_neighbors((1, 4), moore=True)) == 5
+
+        # (0, 3) is part of the neighborhood, (2, 1) is not.
+        agent = self.grid[0][3][0]
+        self.grid.move_agent(agent, (2, 1))
+        assert agent not in self.grid.get_neighbors((1, 4), moore=True)
+        assert len(self.grid.get_neighbors((1, 4), moore=True)) == 4
+        self.grid.move_agent(agent, (0, 3))
+        assert agent in self.grid.get_neighbors((1, 4), moore=True)
+
+    def test_neighbor_cache_toggle(self):
+        """
+        Test that toggling the neighbor cache never serves stale neighbors.
+        """
+        agent = self.grid[0][3][0]
+        self.grid.move_agent(agent, (2, 1))
+        self.grid.neighbor_cache_enabled = True
+        assert len(self.grid.get_neighbors((1, 4), moore=True)) == 4
+
+        # Moves made while the cache is off are not tracked.
+        self.grid.neighbor_cache_enabled = False
+        self.grid.move_agent(agent, (0, 3))
+        assert len(self.grid.get_neighbors((1, 4), moore=True)) == 5
+        self.grid.neighbor_cache_enabled = True
+        assert agent in self.grid.get_neighbors((1, 4), moore=True)
+
+        self.grid.remove_agent(agent)
+        assert len(self.grid.get_neighbors((1, 4), moore=True)) == 4
+
+    def test_pickle(self):
+        """
+        Test that a pickled grid keeps its contents and neighborhoods.
+        """
+        clone = pickle.loads(pickle.dumps(self.grid))
+        assert clone.get_neighborhood((1, 4), moore=True) == (
+            self.grid.get_neighborhood((1, 4), moore=True)
+        )
+        assert len(clone.get_neighbors((1, 4), moore=True)) == 5
+        assert clone.empties == self.grid.empties
+
 
 class TestHexGrid(unittest.TestCase):
     """
@@ -386,6 +511,34 @@ class TestHexGrid(unittest.TestCase):
         neighborhood = self.grid.get_neighborhood((1, 1), include_center=True)
         assert len(neighborhood) == 7
 
+    def test_neighbor_cache(self):
+        """
+        Test that the neighbor cache also serves hexagonal neighborhoods.
+        """
+        expected = self.grid.get_neighbors((1, 1))
+        self.grid.neighbor_cache_enabled = True
+        assert self.grid.get_neighbors((1, 1)) == expected
+        assert len(self.grid._neighbors_cache) == 1
+
+        # (0, 1) is part of the neighborhood, (2, 4) is not.
+        agent = self.grid[0][1]
+        self.grid.move_agent(agent, (2, 4))
+        assert agent not in self.grid.get_neighbors((1, 1))
+        assert len(self.grid.get_neighbors((1, 1))) == len(expected) - 1
+
+    def test_neighbor_cache_size(self):
+        """
+        Test that the neighbor cache drops its oldest query when full.
+        """
+        self.grid.neighbor_cache_enabled = True
+        self.grid._neighbors_cache_size = 2
+        for pos in [(0, 0), (1, 1), (2, 2)]:
+            self.grid.get_neighbors(pos)
+        assert list(self.grid._neighbors_cache) == [
+            ((1, 1), False, 1),
+            ((2, 2), False, 1),
+        ]
+
 
 class TestHexGridTorus(TestBaseGrid):
     """
@@ -1,7 +1,9 @@
+from unittest import mock
 from tornado.testing import AsyncHTTPTestCase
 import tornado
 from mesa import Model
-from mesa.visualization.ModularVisualization import ModularServer
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler
+from mesa.visualization.UserParam import UserSettableParameter
 import json
 
 
@@ -37,3 +39,57 @@ class TestServer(AsyncHTTPTestCase):
         ws_client.write_message("Unknown message!")
         response = yield ws_client.read_message()
         assert response is None
+
+
+class ParamModel(Model):
+    def __init__(self, key=1):
+        super().__init__()
+        self.key = key
+
+
+class TestServerParams(AsyncHTTPTestCase):
+    def get_app(self):
+        app = ModularServer(
+            ParamModel,
+            [],
+            model_params={"key": UserSettableParameter("number", "Key", 1)},
+        )
+        return app
+
+    @tornado.testing.gen_test
+    def test_submit_params(self):
+        ws_url = "ws://localhost:" + str(self.get_http_port()) + "/ws"
+        ws_client = yield tornado.websocket.websocket_connect(ws_url)
+
+        response = yield ws_client.read_message()
+        msg = json.loads(response)
+        assert msg["params"]["key"]["value"] == 1
+
+        ws_client.write_message('{"type": "submit_params", "param": "key", "value": 5}')
+        ws_client.write_message('{"type": "reset"}')
+        response = yield ws_client.read_message()
+        assert json.loads(response)["type"] == "viz_state"
+        assert self._app.model.key == 5
+        assert self._app.user_params["key"]["value"] == 5
+
+        second_client = yield tornado.websocket.websocket_connect(ws_url)
+        response = yield second_client.read_message()
+        assert json.loads(response)["params"]["key"]["value"] == 5
+
+    @tornado.testing.gen_test
+    def test_open_sends_cached_message(self):
+        sent = []
+        write_message = SocketHandler.write_message
+
+        def record(handler, message, binary=False):
+            sent.append(message)
+            return write_message(handler, message, binary=binary)
+
+        ws_url = "ws://localhost:" + str(self.get_http_port()) + "/ws"
+        with mock.patch.object(SocketHandler, "write_message", record):
+            ws_client = yield tornado.websocket.websocket_connect(ws_url)
+            response = yield ws_client.read_message()
+
+        assert isinstance(response, str)
+        assert sent[0] is self._app.user_params_message
+        assert isinstance(sent[0], bytes)
@@ -1,9 +1,13 @@
-from unittest import TestCase
+import json
+from unittest import TestCase, mock, skipIf
 from collections import defaultdict
 
+import numpy as np
+
 from mesa.model import Model
 from mesa.space import Grid
 from mesa.time import SimultaneousActivation
+from mesa.visualization import ModularVisualization
 from mesa.visualization.ModularVisualization import ModularServer
 from mesa.visualization.modules import CanvasGrid, TextElement
 from mesa.visualization.UserParam import UserSettableParameter
@@ -88,3 +92,77 @@ class TestModularServer(TestCase):
                 "slider", "Test Parameter", 200, 0, 300, 10
             ).json,
         }
+
+    def test_set_user_param(self):
+        assert self.server.user_params["key1"]["value"] == 101
+        self.server.set_user_param("key1", 5)
+        assert self.server.user_params["key1"]["value"] == 5
+        message = json.loads(self.server.user_params_message)
+        assert message["params"]["key1"]["value"] == 5
+
+        # Direct changes are picked up once the model is reset.
+        self.server.model_kwargs["key2"].value = 250
+        self.server.reset_model()
+        assert self.server.user_params["key2"]["value"] == 250
+
+    @mock.patch("tornado.ioloop.IOLoop.current")
+    @mock.patch("asyncio.set_event_loop_policy")
+    def test_launch_uvloop(self, set_policy, _):
+        uvloop = mock.Mock()
+        with mock.patch.object(ModularVisualization, "uvloop", uvloop):
+            with mock.patch.object(self.server, "listen"):
+                self.server.launch(open_browser=False, use_uvloop=False)
+                set_policy.assert_not_called()
+                self.server.launch(open_browser=False)
+        set_policy.assert_called_once_with(uvloop.EventLoopPolicy())
+
+    def test_debug_settings(self):
+        assert not self.server.settings["debug"]
+        server = ModularServer(
+            MockModel,
+            self.viz_elements,
+            "Test Model",
+            model_params=self.user_params,
+            debug=True,
+        )
+        assert server.settings["debug"]
+        assert not server.settings["compiled_template_cache"]
+
+
+class TestMessageEncoding(TestCase):
+    """ Test both branches of the websocket message encoder. """
+
+    # A viz_state message as CanvasGrid renders it: integer layer keys.
+    message = {"type": "viz_state", "data": [{0: [{"x": 1, "y": 2, "r": 0.5}]}]}
+    expected = {"type": "viz_state", "data": [{"0": [{"x": 1, "y": 2, "r": 0.5}]}]}
+
+    @skipIf(ModularVisualization.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        encoded = ModularVisualization._json_encode(self.message)
+        assert isinstance(encoded, bytes)
+        assert json.loads(encoded) == self.expected
+        assert ModularVisualization._json_decode(encoded) == self.expected
+
+        numpy_message = {
+            0: [{"x": np.int64(1), "y": np.int32(2), "r": np.float64(0.5)}]
+        }
+        encoded = ModularVisualization._json_encode(numpy_message)
+        assert json.loads(encoded) == self.expected["data"][0]
+
+        # NaN has no JSON spelling; orjson sends it as null.
+        encoded = ModularVisualization._json_encode({"r": float("nan")})
+        assert json.loads(encoded) == {"r": None}
+
+        # Values orjson rejects are left to the stdlib encoder.
+        encoded = ModularVisualization._json_encode({"n": 2 ** 70})
+        assert json.loads(encoded) == {"n": 2 ** 70}
+
+    def test_stdlib_fallback(self):
+        with mock.patch.object(ModularVisualization, "orjson", None):
+            encoded = ModularVisualization._json_encode(self.message)
+            assert json.loads(encoded) == self.expected
+            assert ModularVisualization._json_decode(encoded) == self.expected
+
+            # The fallback is stricter about numpy values.
+            with self.assertRaises(TypeError):
+                ModularVisualization._json_encode({0: [{"x": np.int64(1)}]})